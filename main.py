@@ -1,29 +1,127 @@
 import asyncio
+import functools
 import re
 from datetime import datetime, timezone
-from urllib.parse import quote_plus, urljoin, urlparse
+from html import unescape
+from typing import Literal
+from urllib.parse import ParseResult, quote_plus, urljoin, urlparse
 
+import soupsieve as sv
 from apify import Actor
-from bs4 import BeautifulSoup
-from curl_cffi.requests import Session
+from bs4 import BeautifulSoup, Tag
+from curl_cffi.requests import AsyncSession, Response
 
 SDBULLION_HOST = 'sdbullion.com'
 SDBULLION_HOSTS = {'sdbullion.com', 'www.sdbullion.com'}
 SEARCH_URL_TEMPLATE = 'https://www.sdbullion.com/catalogsearch/result/?q={query}'
-CATEGORY_PATH_KEYWORDS = ['/gold/', '/silver/', '/platinum/', '/palladium/', '/copper/']
-AVAILABILITY_STATES = ['In Stock', 'Out of Stock', 'Pre-Order', 'Sold Out', 'Coming Soon', 'Discontinued']
+CATEGORY_PATH_KEYWORDS = ('/gold/', '/silver/', '/platinum/', '/palladium/', '/copper/')
+AVAILABILITY_STATES = ('In Stock', 'Out of Stock', 'Pre-Order', 'Sold Out', 'Coming Soon', 'Discontinued')
 MAX_DESCRIPTION_LENGTH = 2000
-SKIP_PATH_SEGMENTS = ['/about/', '/shipping/', '/contact/', '/faq/', '/policies/', '/blog/', '/customer/', '/checkout/', '/cart/']
+MAX_CONCURRENCY = 8  # Parallel product-page fetches per listing page
+PUSH_BATCH_SIZE = 50  # Records buffered per dataset write
+MAX_HTML_BYTES = 1024 * 1024  # Product page bodies are truncated past this size
+ETAG_STORE_NAME = 'sdbullion-etags'  # Named key-value store, kept across runs
+ETAG_STORE_KEY = 'PRODUCT_ETAGS'  # Record in that store used by incremental runs
+SKIP_PATH_SEGMENTS = ('/about/', '/shipping/', '/contact/', '/faq/', '/policies/', '/blog/', '/customer/', '/checkout/', '/cart/')
+
+# Precompiled lookups for URL classification (hot path: every listing link)
+_SKIP_RE = re.compile('|'.join(map(re.escape, SKIP_PATH_SEGMENTS)))
+_SUB_CATEGORY_RE = re.compile(r'coin|bar|round|bullion|mint|eagle|maple|all-')
+_TOP_LEVEL_CATEGORIES = frozenset((
+    'gold', 'silver', 'platinum', 'palladium', 'copper', 'on-sale', 'new-arrivals', 'specials',
+))
+
+# Precompiled CSS selectors, so soupsieve doesn't re-parse them per page/card
+# Listing cards
+_SEL_LISTING_ITEMS = sv.compile('.product-item, .product-item-info')
+_SEL_ANCHOR = sv.compile('a')
+_SEL_ANY_LINK = sv.compile('a[href]')
+_SEL_ITEM_NAME = sv.compile('.product-item-link, .product-item-name a, h2 a, h3 a')
+_SEL_ITEM_PRICE = sv.compile('.price-box .price, [data-price-type="finalPrice"] .price, .price-wrapper .price, .price')
+_SEL_ITEM_IMAGE = sv.compile('img.product-image-photo, img[src]')
+_SEL_GRID_ITEMS = sv.compile('.products-grid li, .products.list .item, ol.product-items > li')
+_SEL_GRID_PRICE = sv.compile('[class*="price"]')
+_SEL_IMAGE_SRC = sv.compile('img[src]')
+_SEL_NEXT_PAGE = sv.compile('.pages a.next, a.action.next, .pages-items li.current + li a')
+# Product pages
+_SEL_H1 = sv.compile('h1')
+_SEL_PRODUCT_PRICE = sv.compile(
+    '.price-box .price, .product-info-price .price, '
+    '[data-price-type="finalPrice"] .price, .special-price .price, '
+    '.normal-price .price, span.price'
+)
+_SEL_OG_IMAGE = sv.compile('meta[property="og:image"]')
+_SEL_GALLERY_IMAGE = sv.compile('.gallery-placeholder img, .fotorama__stage img, .product-image-photo')
+_SEL_SKU = sv.compile('[itemprop="sku"], .product.attribute.sku .value, .sku .value')
+_SEL_META_SKU = sv.compile('meta[itemprop="sku"]')
+_SEL_DESCRIPTION = sv.compile(
+    '.product.attribute.description .value, '
+    '[itemprop="description"], #description .value'
+)
+
+# Magento's pager link: <a class="action next" href="..."> (either attribute order)
+_NEXT_LINK_RE = re.compile(
+    r'<a\s[^>]*?class="[^"]*\baction\s+next\b[^"]*"[^>]*?\shref="([^"]+)"'
+    r'|<a\s[^>]*?href="([^"]+)"[^>]*?\sclass="[^"]*\baction\s+next\b[^"]*"',
+    re.IGNORECASE,
+)
+
+_PRICE_RE = re.compile(r'\$?([\d,]+\.?\d*)')
+
+URL_CACHE_SIZE = 16384
+
+UrlKind = Literal['search', 'category', 'product', 'invalid']
+
+
+class CrawlState:
+    """Dedup set, item budget and output buffer shared by every scrape task in a run."""
+
+    def __init__(self, cap: int) -> None:
+        self.cap = cap
+        self.n = 0  # Reserved budget slots
+        self.scraped = 0  # Records handed to push()
+        self.seen: set[str] = set()
+        self.pending: list[dict] = []
+        self.lock = asyncio.Lock()
+
+    @property
+    def full(self) -> bool:
+        return self.n >= self.cap
+
+    async def try_reserve(self, url: str) -> bool:
+        """Atomically claim an unseen URL and one slot of the item budget."""
+        async with self.lock:
+            if url in self.seen or self.n >= self.cap:
+                return False
+            self.seen.add(url)
+            self.n += 1
+            return True
+
+    async def release(self, count: int = 1) -> None:
+        """Return budget slots reserved for products that produced no record."""
+        async with self.lock:
+            self.n -= count
+
+    async def push(self, records: list[dict]) -> None:
+        """Buffer records, writing them to the dataset once PUSH_BATCH_SIZE accumulate."""
+        self.pending.extend(records)
+        self.scraped += len(records)
+        Actor.log.info(f"Scraped {self.scraped}/{self.cap} products")
+        if len(self.pending) >= PUSH_BATCH_SIZE:
+            await self.flush()
 
-products_scraped = 0
-scraped_urls: set[str] = set()
+    async def flush(self) -> None:
+        """Write any buffered records to the dataset."""
+        if self.pending:
+            batch, self.pending = self.pending, []
+            await Actor.push_data(batch)
 
 
 def parse_price(price_str: str) -> float | None:
     """Extract numeric price from a string like '$5,120.96'."""
     if not price_str:
         return None
-    match = re.search(r'\$?([\d,]+\.?\d*)', price_str)
+    match = _PRICE_RE.search(price_str)
     if match:
         try:
             return float(match.group(1).replace(',', ''))
@@ -32,74 +130,102 @@ def parse_price(price_str: str) -> float | None:
     return None
 
 
+def _is_sdbullion(parsed: ParseResult) -> bool:
+    """Check that an already-parsed URL is http(s) on an sdbullion.com host."""
+    return parsed.scheme in ('http', 'https') and (parsed.hostname or '') in SDBULLION_HOSTS
+
+
+def _canon(url: str) -> str:
+    """Canonical form of a URL used for dedup and as the classification cache key."""
+    return url.rstrip('/')
+
+
 def validate_url(url: str) -> bool:
     """Validate that a URL is well-formed and belongs to sdbullion.com."""
     try:
-        parsed = urlparse(url)
-        host = parsed.hostname or ''
-        return parsed.scheme in ('http', 'https') and host in SDBULLION_HOSTS
+        return _is_sdbullion(urlparse(url))
     except Exception:
         return False
 
 
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
+def _classify(url: str) -> UrlKind:
+    """Classify a URL as a search, category, or product page in a single pass.
+
+    Runs ``urlparse`` once and memoizes the result, since the same URLs recur
+    across pagination and dedup checks. Anything that is neither a listing nor
+    a scrapeable sdbullion.com product page is tagged ``'invalid'``.
+    """
+    if '/catalogsearch/' in url or 'q=' in url:
+        return 'search'
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return 'invalid'
+
+    # Category/listing detection is based on path structure only
+    path = parsed.path.strip('/').lower()
+    if not path:
+        return 'category'  # Homepage
+    segments = [s for s in path.split('/') if s]
+    if segments[0] in _TOP_LEVEL_CATEGORIES:
+        if len(segments) == 1:
+            return 'category'
+        if len(segments) == 2 and _SUB_CATEGORY_RE.search(segments[1]):
+            return 'category'
+    if 'inventory' in path:
+        return 'category'
+
+    if not _is_sdbullion(parsed):
+        return 'invalid'
+    if _SKIP_RE.search(url):
+        return 'invalid'
+    if '.' in segments[-1]:  # File-like last segment (image, document, ...)
+        return 'invalid'
+    return 'product'
+
+
 def is_search_url(url: str) -> bool:
     """Determine if a URL is a search results page."""
-    return '/catalogsearch/' in url or 'q=' in url
+    return _classify(url) == 'search'
 
 
 def is_category_url(url: str) -> bool:
     """Determine if a URL is a category/listing page based on path structure."""
-    if is_search_url(url):
-        return False
-    parsed = urlparse(url)
-    path = parsed.path.lower().strip('/')
-    if not path:
-        return True  # Homepage
-    segments = [s for s in path.split('/') if s]
-    top_level_categories = ('gold', 'silver', 'platinum', 'palladium', 'copper', 'on-sale', 'new-arrivals', 'specials')
-    if len(segments) == 1 and segments[0] in top_level_categories:
-        return True
-    if len(segments) == 2 and segments[0] in top_level_categories:
-        sub = segments[1]
-        if any(cat in sub for cat in ('coin', 'bar', 'round', 'bullion', 'mint', 'eagle', 'maple', 'all-')):
-            return True
-    if 'inventory' in path:
-        return True
-    return False
+    return _classify(url) == 'category'
 
 
 def is_product_url(url: str) -> bool:
     """Check if a URL looks like a product page (not category, search, or informational)."""
-    if not validate_url(url):
-        return False
-    if is_search_url(url):
-        return False
-    if any(skip in url for skip in SKIP_PATH_SEGMENTS):
-        return False
-    parsed = urlparse(url)
-    path = parsed.path.strip('/')
-    if not path:
-        return False
-    if '.' in path.rsplit('/', 1)[-1]:
-        return False
-    if not is_category_url(url):
-        return True
-    return False
+    return _classify(url) == 'product'
 
 
-def extract_listing_products(html: str, base_url: str) -> list[dict]:
-    """Extract products from a Magento 2 listing page HTML."""
-    soup = BeautifulSoup(html, 'html.parser')
+def _pick_card_link(item: Tag) -> Tag | None:
+    """Pick a card's product link in one walk over its anchors.
+
+    Same priority as trying each selector in turn: ``a.product-item-link``,
+    then ``a.product-item-photo``, then the first ``a[href]``.
+    """
+    photo_link = any_link = None
+    for anchor in _SEL_ANCHOR.select(item):
+        classes = anchor.get('class') or ()
+        if 'product-item-link' in classes:
+            return anchor
+        if photo_link is None and 'product-item-photo' in classes:
+            photo_link = anchor
+        if any_link is None and anchor.has_attr('href'):
+            any_link = anchor
+    return photo_link or any_link
+
+
+def extract_listing_products(soup: BeautifulSoup, base_url: str) -> list[dict]:
+    """Extract products from a parsed Magento 2 listing page."""
     products = []
     seen = set()
 
     # Strategy 1: Magento 2 product-item selectors
-    for item in soup.select('.product-item, .product-item-info'):
-        link_el = (
-            item.select_one('a.product-item-link')
-            or item.select_one('a.product-item-photo')
-            or item.select_one('a[href]')
-        )
+    for item in _SEL_LISTING_ITEMS.select(soup):
+        link_el = _pick_card_link(item)
         if not link_el:
             continue
 
@@ -108,13 +234,13 @@ def extract_listing_products(html: str, base_url: str) -> list[dict]:
             continue
         seen.add(url)
 
-        name_el = item.select_one('.product-item-link, .product-item-name a, h2 a, h3 a')
+        name_el = _SEL_ITEM_NAME.select_one(item)
         name = name_el.get_text(strip=True) if name_el else (link_el.get('title', '') or link_el.get_text(strip=True))
 
-        price_el = item.select_one('.price-box .price, [data-price-type="finalPrice"] .price, .price-wrapper .price, .price')
+        price_el = _SEL_ITEM_PRICE.select_one(item)
         price = price_el.get_text(strip=True) if price_el else None
 
-        img_el = item.select_one('img.product-image-photo, img[src]')
+        img_el = _SEL_ITEM_IMAGE.select_one(item)
         image = None
         if img_el:
             image = img_el.get('src') or img_el.get('data-src')
@@ -124,8 +250,8 @@ def extract_listing_products(html: str, base_url: str) -> list[dict]:
 
     # Strategy 2: Broader product grid fallback
     if not products:
-        for item in soup.select('.products-grid li, .products.list .item, ol.product-items > li'):
-            link_el = item.select_one('a[href]')
+        for item in _SEL_GRID_ITEMS.select(soup):
+            link_el = _SEL_ANY_LINK.select_one(item)
             if not link_el:
                 continue
             url = urljoin(base_url, link_el.get('href', ''))
@@ -134,10 +260,10 @@ def extract_listing_products(html: str, base_url: str) -> list[dict]:
             seen.add(url)
 
             name = link_el.get_text(strip=True) or link_el.get('title', '')
-            price_el = item.select_one('[class*="price"]')
+            price_el = _SEL_GRID_PRICE.select_one(item)
             price = price_el.get_text(strip=True) if price_el else None
 
-            img_el = item.select_one('img[src]')
+            img_el = _SEL_IMAGE_SRC.select_one(item)
             image = img_el.get('src') if img_el else None
 
             if name and len(name) > 3:
@@ -148,32 +274,30 @@ def extract_listing_products(html: str, base_url: str) -> list[dict]:
 
 def extract_product_details(html: str) -> dict:
     """Extract product details from a Magento 2 product page HTML."""
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = BeautifulSoup(html, 'lxml')
 
     # Name
-    h1 = soup.select_one('h1')
+    h1 = _SEL_H1.select_one(soup)
     name = h1.get_text(strip=True) if h1 else None
 
     # Price
-    price_el = soup.select_one(
-        '.price-box .price, .product-info-price .price, '
-        '[data-price-type="finalPrice"] .price, .special-price .price, '
-        '.normal-price .price, span.price'
-    )
+    price_el = _SEL_PRODUCT_PRICE.select_one(soup)
     price_text = price_el.get_text(strip=True) if price_el else None
 
     # Image — og:image first, then product gallery
-    og_image = soup.select_one('meta[property="og:image"]')
+    og_image = _SEL_OG_IMAGE.select_one(soup)
     image_url = og_image.get('content') if og_image else None
     if not image_url:
-        img_el = soup.select_one('.gallery-placeholder img, .fotorama__stage img, .product-image-photo')
+        img_el = _SEL_GALLERY_IMAGE.select_one(soup)
         image_url = img_el.get('src') if img_el else None
 
     # SKU
-    sku_el = soup.select_one('[itemprop="sku"], .product.attribute.sku .value, .sku .value')
+    sku_el = _SEL_SKU.select_one(soup)
     sku = sku_el.get_text(strip=True) if sku_el else None
-    if not sku:
-        meta_sku = soup.select_one('meta[itemprop="sku"]')
+    if not sku and sku_el is not None:
+        # A first match of <meta itemprop="sku"> is the meta fallback itself
+        is_meta_sku = sku_el.name == 'meta' and sku_el.get('itemprop') == 'sku'
+        meta_sku = sku_el if is_meta_sku else _SEL_META_SKU.select_one(soup)
         sku = meta_sku.get('content') if meta_sku else None
 
     # Availability
@@ -185,10 +309,7 @@ def extract_product_details(html: str) -> dict:
             break
 
     # Description
-    desc_el = soup.select_one(
-        '.product.attribute.description .value, '
-        '[itemprop="description"], #description .value'
-    )
+    desc_el = _SEL_DESCRIPTION.select_one(soup)
     description = desc_el.get_text(strip=True)[:MAX_DESCRIPTION_LENGTH] if desc_el else None
 
     return {
@@ -202,22 +323,32 @@ def extract_product_details(html: str) -> dict:
     }
 
 
-def get_next_page_url(html: str, base_url: str) -> str | None:
-    """Get the next page URL from Magento 2 pagination."""
-    soup = BeautifulSoup(html, 'html.parser')
-    next_link = soup.select_one('.pages a.next, a.action.next, .pages-items li.current + li a')
+def get_next_page_url(html: str, base_url: str, soup: BeautifulSoup | None = None) -> str | None:
+    """Get the next page URL from Magento 2 pagination.
+
+    Tries a regex over the raw HTML for the standard ``a.action.next`` link
+    first, and only falls back to CSS selectors (parsing the page if no
+    ``soup`` is given) when that misses.
+    """
+    match = _NEXT_LINK_RE.search(html)
+    if match:
+        return urljoin(base_url, unescape(match.group(1) or match.group(2)))
+
+    if soup is None:
+        soup = BeautifulSoup(html, 'lxml')
+    next_link = _SEL_NEXT_PAGE.select_one(soup)
     if next_link:
         return urljoin(base_url, next_link.get('href', ''))
     return None
 
 
-def init_session(proxies: dict) -> Session:
+async def init_session(proxies: dict) -> AsyncSession:
     """Create an HTTP session with Chrome TLS impersonation and warm it up
     by visiting the homepage to establish WAF cookies."""
-    http = Session(impersonate="chrome110")
+    http = AsyncSession(impersonate="chrome110", max_clients=MAX_CONCURRENCY)
 
     # Visit homepage to get WAF session cookies (required before other pages)
-    home_resp = http.get("https://www.sdbullion.com/", proxies=proxies, timeout=30)
+    home_resp = await http.get("https://www.sdbullion.com/", proxies=proxies, timeout=30)
     Actor.log.info(f"Homepage warm-up: status={home_resp.status_code}, cookies={len(http.cookies)}")
 
     if home_resp.status_code != 200:
@@ -229,152 +360,228 @@ def init_session(proxies: dict) -> Session:
     return http
 
 
-async def scrape_listing(http: Session, url: str, proxies: dict, max_items: int) -> None:
-    """Scrape a search or category listing page and follow pagination."""
-    global products_scraped
-
-    page_num = 1
-    current_url = url
-
-    while current_url and products_scraped < max_items:
-        Actor.log.info(f"Fetching listing page {page_num}: {current_url}")
-
+class Scraper:
+    """Scrapes listing and product pages over one HTTP session into a shared CrawlState."""
+
+    def __init__(
+        self, http: AsyncSession, proxies: dict, max_items: int, etags: dict[str, str] | None = None,
+    ) -> None:
+        self.http = http
+        self.proxies = proxies
+        self.state = CrawlState(max_items)
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        # Product URL -> ETag; entries loaded from a previous run make product
+        # fetches conditional, and every fresh ETag seen is recorded here
+        self.etags: dict[str, str] = etags if etags is not None else {}
+
+    async def get(self, url: str, etag: str | None = None, max_bytes: int | None = None) -> Response:
+        """GET a page through the run's session and proxy.
+
+        With ``max_bytes`` the body is streamed and the transfer aborted past
+        that size, so oversized pages cost neither bandwidth nor parse time.
+        With an ``etag`` the request is conditional and may return 304.
+        """
+        headers = {'If-None-Match': etag} if etag else None
+        if max_bytes is None:
+            return await self.http.get(url, proxies=self.proxies, timeout=30, headers=headers)
+        response = await self.http.get(url, proxies=self.proxies, timeout=30, stream=True, headers=headers)
+        chunks = []
+        size = 0
         try:
-            response = http.get(current_url, proxies=proxies, timeout=30)
+            async for chunk in response.aiter_content():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    # quit_now is a curl_cffi internal (checked against 0.16.x, pinned
+                    # in requirements.txt); setting it makes curl drop the transfer
+                    response.quit_now.set()
+                    Actor.log.warning(f"Page body exceeds {max_bytes} bytes, truncating: {url}")
+                    break
+        finally:
+            await response.aclose()
+        response.content = b''.join(chunks)[:max_bytes]
+        return response
+
+    def _remember_etag(self, url: str, response: Response) -> None:
+        etag = response.headers.get('etag')
+        if etag:
+            self.etags[url] = etag
+
+    async def scrape_listed_product(self, prod_url: str, product: dict, scraped_at: str) -> dict | None:
+        """Build the record for a listing card from its full product page, falling back to the listing data.
+
+        Returns None when the product page is unchanged since the run its ETag came from.
+        """
+        try:
+            async with self.semaphore:
+                prod_resp = await self.get(prod_url, self.etags.get(prod_url), MAX_HTML_BYTES)
+            if prod_resp.status_code == 304:
+                Actor.log.info(f"Product {prod_url} unchanged since last run, skipping")
+                return None
+            if prod_resp.status_code == 200:
+                self._remember_etag(prod_url, prod_resp)
+                details = extract_product_details(prod_resp.text)
+                return {
+                    'url': prod_url,
+                    'name': details['name'] or product.get('name', ''),
+                    'price': details['price'] or (product.get('price') if product.get('price') and '$' in str(product.get('price')) else None),
+                    'priceNumeric': details['priceNumeric'] or parse_price(product.get('price')),
+                    'imageUrl': details['imageUrl'] or product.get('image'),
+                    'sku': details['sku'],
+                    'availability': details['availability'],
+                    'description': details['description'],
+                    'scrapedAt': scraped_at,
+                }
+            # Fall back to listing data if product page fails
+            Actor.log.warning(f"Product page {prod_url} returned {prod_resp.status_code}, using listing data")
         except Exception as e:
-            Actor.log.error(f"Failed to fetch listing {current_url}: {e}")
-            break
-
-        if response.status_code != 200:
-            Actor.log.warning(f"Non-200 status ({response.status_code}) for listing {current_url}")
-            break
+            Actor.log.warning(f"Failed to fetch product {prod_url}: {e}, using listing data")
+
+        price_text = product.get('price')
+        return {
+            'url': prod_url,
+            'name': product.get('name', ''),
+            'price': price_text if price_text and '$' in str(price_text) else None,
+            'priceNumeric': parse_price(price_text) if price_text else None,
+            'imageUrl': product.get('image'),
+            'sku': None,
+            'availability': None,
+            'description': None,
+            'scrapedAt': scraped_at,
+        }
+
+    async def scrape_listing(self, url: str) -> None:
+        """Scrape a search or category listing page and follow pagination."""
+        state = self.state
+        page_num = 1
+        current_url = url
+        prefetched: asyncio.Task | None = None
 
-        products = extract_listing_products(response.text, current_url)
-        Actor.log.info(f"Found {len(products)} products on listing page {page_num}")
-
-        skipped = 0
-        for product in products:
-            if products_scraped >= max_items:
-                break
-
-            prod_url = product['url'].rstrip('/')
-            if not is_product_url(prod_url):
-                skipped += 1
-                continue
-            if prod_url in scraped_urls:
-                continue
-            scraped_urls.add(prod_url)
-
-            # Fetch the full product page for detailed data
-            try:
-                prod_resp = http.get(prod_url, proxies=proxies, timeout=30)
-                if prod_resp.status_code == 200:
-                    details = extract_product_details(prod_resp.text)
-                    await Actor.push_data({
-                        'url': prod_url,
-                        'name': details['name'] or product.get('name', ''),
-                        'price': details['price'] or (product.get('price') if product.get('price') and '$' in str(product.get('price')) else None),
-                        'priceNumeric': details['priceNumeric'] or parse_price(product.get('price')),
-                        'imageUrl': details['imageUrl'] or product.get('image'),
-                        'sku': details['sku'],
-                        'availability': details['availability'],
-                        'description': details['description'],
-                        'scrapedAt': datetime.now(timezone.utc).isoformat(),
-                    })
+        try:
+            while current_url and not state.full:
+                Actor.log.info(f"Fetching listing page {page_num}: {current_url}")
+
+                fetch = prefetched or self.get(current_url)
+                prefetched = None
+                try:
+                    response = await fetch
+                except Exception as e:
+                    Actor.log.error(f"Failed to fetch listing {current_url}: {e}")
+                    break
+
+                if response.status_code != 200:
+                    Actor.log.warning(f"Non-200 status ({response.status_code}) for listing {current_url}")
+                    break
+
+                # Parse once; the same tree serves card extraction and the pagination fallback
+                soup = BeautifulSoup(response.text, 'lxml')
+                products = extract_listing_products(soup, current_url)
+                next_url = get_next_page_url(response.text, current_url, soup)
+                Actor.log.info(f"Found {len(products)} products on listing page {page_num}")
+
+                has_next = next_url and next_url != current_url
+                scraped_at = datetime.now(timezone.utc).isoformat()
+
+                # Reserve this page's products (within the remaining budget), then fetch
+                # their detail pages concurrently. Unchanged products hand their slot
+                # back, so go on through the page's remaining cards before paginating
+                skipped = 0
+                cards = iter(products)
+                while not state.full:
+                    queued = []
+                    for product in cards:
+                        prod_url = _canon(product['url'])
+                        if prod_url in state.seen:
+                            continue  # Already scraped from an earlier page
+                        if _classify(prod_url) != 'product':
+                            skipped += 1
+                            continue
+                        if not await state.try_reserve(prod_url):
+                            continue
+                        queued.append((prod_url, product))
+                        if state.full:
+                            break
+                    if not queued:
+                        break
+
+                    # Start the next listing page downloading alongside this page's products
+                    if has_next and prefetched is None and not state.full:
+                        prefetched = asyncio.create_task(self.get(next_url))
+
+                    # Hand each round's records to the buffered dataset writer at once
+                    results = await asyncio.gather(*(
+                        self.scrape_listed_product(prod_url, product, scraped_at)
+                        for prod_url, product in queued
+                    ))
+                    batch = [record for record in results if record is not None]
+                    if len(batch) < len(results):
+                        await state.release(len(results) - len(batch))
+                    if batch:
+                        await state.push(batch)
+
+                if skipped:
+                    Actor.log.info(f"Skipped {skipped} non-product URLs")
+
+                # Follow pagination
+                if has_next:
+                    current_url = next_url
+                    page_num += 1
                 else:
-                    # Fall back to listing data if product page fails
-                    Actor.log.warning(f"Product page {prod_url} returned {prod_resp.status_code}, using listing data")
-                    price_text = product.get('price')
-                    await Actor.push_data({
-                        'url': prod_url,
-                        'name': product.get('name', ''),
-                        'price': price_text if price_text and '$' in str(price_text) else None,
-                        'priceNumeric': parse_price(price_text) if price_text else None,
-                        'imageUrl': product.get('image'),
-                        'sku': None,
-                        'availability': None,
-                        'description': None,
-                        'scrapedAt': datetime.now(timezone.utc).isoformat(),
-                    })
-            except Exception as e:
-                Actor.log.warning(f"Failed to fetch product {prod_url}: {e}, using listing data")
-                price_text = product.get('price')
-                await Actor.push_data({
-                    'url': prod_url,
-                    'name': product.get('name', ''),
-                    'price': price_text if price_text and '$' in str(price_text) else None,
-                    'priceNumeric': parse_price(price_text) if price_text else None,
-                    'imageUrl': product.get('image'),
-                    'sku': None,
-                    'availability': None,
-                    'description': None,
-                    'scrapedAt': datetime.now(timezone.utc).isoformat(),
-                })
-
-            products_scraped += 1
-            Actor.log.info(f"Scraped {products_scraped}/{max_items} products")
-
-        if skipped:
-            Actor.log.info(f"Skipped {skipped} non-product URLs")
-
-        # Check for next page
-        next_url = get_next_page_url(response.text, current_url)
-        if next_url and next_url != current_url:
-            current_url = next_url
-            page_num += 1
-        else:
-            break
-
+                    break
+        finally:
+            # A prefetch left unawaited (budget filled, or an error above) is dropped
+            if prefetched is not None and not prefetched.cancel():
+                prefetched.exception()  # Already finished; retrieve so a failure isn't reported as unhandled
 
-async def scrape_product(http: Session, url: str, proxies: dict, max_items: int) -> None:
-    """Scrape a single product page."""
-    global products_scraped
-    if products_scraped >= max_items:
-        return
-
-    url = url.rstrip('/')
-    if url in scraped_urls:
-        return
-    scraped_urls.add(url)
-
-    Actor.log.info(f"Fetching product ({products_scraped + 1}/{max_items}): {url}")
-
-    try:
-        response = http.get(url, proxies=proxies, timeout=30)
-    except Exception as e:
-        Actor.log.error(f"Failed to fetch product {url}: {e}")
-        return
+    async def scrape_product(self, url: str) -> None:
+        """Scrape a single product page."""
+        state = self.state
+        url = _canon(url)
+        if not await state.try_reserve(url):
+            return
 
-    if response.status_code != 200:
-        Actor.log.warning(f"Non-200 status ({response.status_code}) for product {url}")
-        return
+        Actor.log.info(f"Fetching product ({state.n}/{state.cap}): {url}")
 
-    details = extract_product_details(response.text)
+        try:
+            response = await self.get(url, self.etags.get(url), MAX_HTML_BYTES)
+        except Exception as e:
+            Actor.log.error(f"Failed to fetch product {url}: {e}")
+            await state.release()
+            return
 
-    await Actor.push_data({
-        'url': url,
-        'name': details['name'],
-        'price': details['price'],
-        'priceNumeric': details['priceNumeric'],
-        'imageUrl': details['imageUrl'],
-        'sku': details['sku'],
-        'availability': details['availability'],
-        'description': details['description'],
-        'scrapedAt': datetime.now(timezone.utc).isoformat(),
-    })
+        if response.status_code == 304:
+            Actor.log.info(f"Product {url} unchanged since last run, skipping")
+            await state.release()
+            return
 
-    products_scraped += 1
-    Actor.log.info(f"Scraped {products_scraped}/{max_items} products")
+        if response.status_code != 200:
+            Actor.log.warning(f"Non-200 status ({response.status_code}) for product {url}")
+            await state.release()
+            return
+
+        self._remember_etag(url, response)
+        details = extract_product_details(response.text)
+
+        await state.push([{
+            'url': url,
+            'name': details['name'],
+            'price': details['price'],
+            'priceNumeric': details['priceNumeric'],
+            'imageUrl': details['imageUrl'],
+            'sku': details['sku'],
+            'availability': details['availability'],
+            'description': details['description'],
+            'scrapedAt': datetime.now(timezone.utc).isoformat(),
+        }])
 
 
 async def main():
-    global products_scraped
-
     async with Actor:
         actor_input = await Actor.get_input() or {}
         start_urls_input = actor_input.get("start_urls", [])
         search_terms = actor_input.get("search_terms", [])
         max_items = actor_input.get("max_items", 10)
+        incremental = actor_input.get("incremental", False)
 
         # Build URLs from search terms
         start_urls = []
@@ -421,22 +628,37 @@ async def main():
         proxies = {"http": proxy_url, "https": proxy_url}
 
         # Initialize HTTP session with Chrome TLS impersonation + homepage warm-up
-        http = init_session(proxies)
+        http = await init_session(proxies)
+        etags = None
+        etag_store = None
+        if incremental:
+            # The default store is per-run, so the ETags live in a named one
+            etag_store = await Actor.open_key_value_store(name=ETAG_STORE_NAME)
+            etags = await etag_store.get_value(ETAG_STORE_KEY) or {}
+            Actor.log.info(f"Incremental mode: {len(etags)} product ETags from previous runs")
+        scraper = Scraper(http, proxies, max_items, etags)
 
         # Process start URLs
-        for url in start_urls:
-            if products_scraped >= max_items:
-                break
-
-            if is_search_url(url) or is_category_url(url):
-                await scrape_listing(http, url, proxies, max_items)
-            elif is_product_url(url):
-                await scrape_product(http, url, proxies, max_items)
-            else:
-                Actor.log.warning(f"Could not classify URL, trying as listing: {url}")
-                await scrape_listing(http, url, proxies, max_items)
-
-        Actor.log.info(f'Scraping completed. Total products scraped: {products_scraped}')
+        try:
+            for url in start_urls:
+                if scraper.state.full:
+                    break
+
+                kind = _classify(url)  # Raw URL: skip segments match on their trailing slash
+                if kind in ('search', 'category'):
+                    await scraper.scrape_listing(url)
+                elif kind == 'product':
+                    await scraper.scrape_product(url)
+                else:
+                    Actor.log.warning(f"Could not classify URL, trying as listing: {url}")
+                    await scraper.scrape_listing(url)
+        finally:
+            await scraper.state.flush()
+            await http.close()
+            if etag_store is not None:
+                await etag_store.set_value(ETAG_STORE_KEY, scraper.etags)
+
+        Actor.log.info(f'Scraping completed. Total products scraped: {scraper.state.scraped}')
 
 
 if __name__ == "__main__":